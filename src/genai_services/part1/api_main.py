@@ -1,90 +1,266 @@
+import asyncio
+import threading
+from collections import defaultdict
 from collections.abc import AsyncIterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from io import BytesIO
 from typing import Annotated
 
 import httpx
 from fastapi import Body, FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import PlainTextResponse, StreamingResponse
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from openai import OpenAI
+from loguru import logger
+from openai import AsyncOpenAI
+from transformers import TextIteratorStreamer
 
 from genai_services.part1.models import (
     generate_audio,
     generate_text,
+    generate_texts,
     load_audio_model,
     load_text_model,
+    stream_text,
 )
 from genai_services.part1.schemas import (
     TextModelRequest,
     TextModelResponse,
     VoicePresets,
 )
-from genai_services.utils import audio_array_to_buffer, normalize_text
+from genai_services.settings import settings
+from genai_services.utils import (
+    LRUCache,
+    MicroBatcher,
+    audio_array_to_wav_chunks,
+    normalize_text,
+    sse_event,
+)
 
 models = {}
+# Dedicated executors keep blocking work off the shared anyio threadpool; model
+# executors have a single worker since the pipelines are not re-entrant
+executors: dict[str, ThreadPoolExecutor] = {}
+
+# Identical prompts are served from memory instead of re-running the models
+# Text entries carry the generated token count, or None when it was not tracked
+text_cache: LRUCache[tuple[str, int | None]] = LRUCache(maxsize=512, ttl=3600)
+audio_cache: LRUCache[bytes] = LRUCache(maxsize=128, ttl=3600)
+image_cache: LRUCache[bytes] = LRUCache(maxsize=128, ttl=3600)
+
+
+async def process_text_batch(
+    requests: list[tuple[str, float]],
+) -> list[tuple[str, int]]:
+    """Generate text for queued (prompt, temperature) requests, one pass per temperature."""
+    groups: dict[float, list[int]] = defaultdict(list)
+    for index, (_, temperature) in enumerate(requests):
+        groups[temperature].append(index)
+
+    loop = asyncio.get_running_loop()
+    outputs: dict[int, tuple[str, int]] = {}
+    for temperature, indices in groups.items():
+        prompts = [requests[index][0] for index in indices]
+        texts = await loop.run_in_executor(
+            executors["text"], generate_texts, models["text"], prompts, temperature
+        )
+        outputs.update(zip(indices, texts, strict=True))
+    return [outputs[index] for index in range(len(requests))]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     models["text"] = load_text_model()
     models["audio"] = load_audio_model()
+    executors["text"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="text")
+    executors["audio"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+    if settings.warmup:
+        # Pay tokenizer spin-up and kernel compilation before the first real request
+        logger.info("Warming up text and audio models...")
+        generate_text(models["text"], "hi", temperature=0.7)
+        generate_audio(*models["audio"], "hi", "v2/en_speaker_1")
+        logger.success("Models warmed up")
+    # Concurrent text requests arriving within 10ms share one forward pass
+    app.state.text_batcher = MicroBatcher(
+        process_text_batch, max_batch_size=8, max_wait_ms=10
+    )
+    app.state.text_batcher.start()
+    # Shared client keeps connections to the BentoML service alive across requests
+    app.state.http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(120.0),
+        limits=httpx.Limits(
+            max_keepalive_connections=40, max_connections=100, keepalive_expiry=30.0
+        ),
+    )
 
     yield
 
+    await app.state.text_batcher.stop()
+    await app.state.http_client.aclose()
+    for executor in executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    executors.clear()
     models.clear()
+    text_cache.clear()
+    audio_cache.clear()
+    image_cache.clear()
 
 
 app = FastAPI(lifespan=lifespan)
-openai_client = OpenAI()
+openai_client = AsyncOpenAI()
+# The chain is immutable, so it is built once and shared across requests
+langchain_chain = (
+    ChatPromptTemplate.from_messages(
+        [
+            ("system", "You are a helpful assistant."),
+            ("user", "{prompt}"),
+        ]
+    )
+    | ChatOpenAI(model="gpt-4o-mini")
+    | StrOutputParser()
+)
 
 
 @app.post("/generate/text")
-def serve_text_to_text_controller(
+async def serve_text_to_text_controller(
     request: Request,
     body: Annotated[TextModelRequest, Body(description="Text model request")],
 ) -> TextModelResponse:
-    pipe = models["text"]
-    output = generate_text(pipe, body.prompt, body.temperature)
+    cache_key = (body.prompt, body.temperature, body.model)
+    cached = text_cache.get(cache_key)
+    if cached is None:
+        batcher: MicroBatcher[tuple[str, float], tuple[str, int]] = (
+            request.app.state.text_batcher
+        )
+        cached = await batcher.submit((body.prompt, body.temperature))
+        text_cache.set(cache_key, cached)
+    output, tokens = cached
     return TextModelResponse(
         content=normalize_text(output),
+        tokens=tokens,
         model=body.model,
         temperature=body.temperature,
         ip=request.client.host,
     )
 
 
+def log_generation_failure(future: Future) -> None:
+    """Log the error of a background text generation that failed."""
+    if not future.cancelled() and (exc := future.exception()) is not None:
+        logger.opt(exception=exc).error("Streaming text generation failed")
+
+
+@app.post(
+    "/generate/text/stream",
+    responses={status.HTTP_200_OK: {"content": {"text/event-stream": {}}}},
+    response_class=StreamingResponse,
+)
+async def serve_text_to_text_stream_controller(
+    request: Request,
+    body: Annotated[TextModelRequest, Body(description="Text model request")],
+) -> StreamingResponse:
+    cache_key = (body.prompt, body.temperature, body.model)
+    if (cached := text_cache.get(cache_key)) is not None:
+        return StreamingResponse(
+            iter([sse_event(cached[0])]), media_type="text/event-stream"
+        )
+
+    pipe = models["text"]
+    # The timeout stops the response from hanging if generation never starts
+    streamer = TextIteratorStreamer(
+        pipe.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=120.0
+    )
+    stop = threading.Event()
+    generation = executors["text"].submit(
+        stream_text, pipe, body.prompt, streamer, body.temperature, stop_event=stop
+    )
+    generation.add_done_callback(log_generation_failure)
+
+    async def stream_events() -> AsyncIterator[str]:
+        tokens: list[str] = []
+        try:
+            # The streamer blocks between tokens, so each read hops to a thread
+            while (token := await run_in_threadpool(next, streamer, None)) is not None:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected - stopping text generation")
+                    return
+                if token:
+                    tokens.append(token)
+                    yield sse_event(token)
+        finally:
+            # Stops an abandoned generation so it doesn't hold the only text worker
+            stop.set()
+        try:
+            await asyncio.wrap_future(generation)
+        except Exception:
+            # Failed generations end the streamer early and are logged by the
+            # done callback; a partial reply must not be cached
+            return
+        # Streamed chunks are not 1:1 with tokens, so the count is left to the schema
+        text_cache.set(cache_key, ("".join(tokens), None))
+
+    return StreamingResponse(stream_events(), media_type="text/event-stream")
+
+
 @app.get(
     "/generate/audio",
     responses={status.HTTP_200_OK: {"content": {"audio/wav": {}}}},
     response_class=StreamingResponse,
 )
-def serve_text_to_audio_model_controller(
-    prompt: str, preset: VoicePresets = "v2/en_speaker_1"
+async def serve_text_to_audio_model_controller(
+    request: Request, prompt: str, preset: VoicePresets = "v2/en_speaker_1"
 ) -> StreamingResponse:
+    cache_key = (prompt, preset)
+    if (audio_bytes := audio_cache.get(cache_key)) is not None:
+        return StreamingResponse(BytesIO(audio_bytes), media_type="audio/wav")
+
     processor, model = models["audio"]
-    output, sample_rate = generate_audio(processor, model, prompt, preset)
-    buffer = audio_array_to_buffer(output, sample_rate)
-    return StreamingResponse(buffer, media_type="audio/wav")
+    output, sample_rate = await asyncio.get_running_loop().run_in_executor(
+        executors["audio"], generate_audio, processor, model, prompt, preset
+    )
+
+    async def stream_wav() -> AsyncIterator[bytes]:
+        # Encode and send frame by frame so playback starts before encoding ends
+        chunks: list[bytes] = []
+        for chunk in audio_array_to_wav_chunks(output, sample_rate):
+            if await request.is_disconnected():
+                logger.info("Client disconnected - stopping audio stream")
+                return
+            chunks.append(chunk)
+            yield chunk
+        audio_cache.set(cache_key, b"".join(chunks))
+
+    return StreamingResponse(stream_wav(), media_type="audio/wav")
 
 
 @app.get(
     "/generate/bentoml/image",
-    responses={status.HTTP_200_OK: {"content": {"image/png": {}}}},
+    responses={status.HTTP_200_OK: {"content": {"image/webp": {}}}},
     response_class=Response,
 )
-async def serve_bentoml_text_to_image_model_controller(prompt: str) -> Response:
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(
-            "http://localhost:5001/generate/image", json={"prompt": prompt}
-        )
-    return Response(content=response.content, media_type="image/png")
+async def serve_bentoml_text_to_image_model_controller(
+    request: Request, prompt: str
+) -> Response:
+    if (image_bytes := image_cache.get(prompt)) is not None:
+        return Response(content=image_bytes, media_type="image/webp")
+    client: httpx.AsyncClient = request.app.state.http_client
+    response = await client.post(
+        "http://localhost:5001/generate/image", json={"prompt": prompt}
+    )
+    if response.is_success:
+        image_cache.set(prompt, response.content)
+    return Response(
+        content=response.content,
+        media_type=response.headers.get("content-type", "image/webp"),
+    )
 
 
 @app.get("/generate/openai/text", response_class=Response)
-def serve_openai_text_model_controller(prompt: str) -> str | None:
-    response = openai_client.chat.completions.create(
+async def serve_openai_text_model_controller(prompt: str) -> str | None:
+    response = await openai_client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "You are a helpful assistant."},
@@ -95,15 +271,6 @@ def serve_openai_text_model_controller(prompt: str) -> str | None:
 
 
 @app.get("/generate/langchain/text", response_class=PlainTextResponse)
-def serve_langchain_text_model_controller(prompt: str) -> PlainTextResponse:
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are a helpful assistant."),
-            ("user", "{prompt}"),
-        ]
-    )
-    model = ChatOpenAI(model="gpt-4o-mini")
-    output_parser = StrOutputParser()
-    chain = prompt_template | model | output_parser
-    result = chain.invoke({"prompt": prompt})
+async def serve_langchain_text_model_controller(prompt: str) -> PlainTextResponse:
+    result = await langchain_chain.ainvoke({"prompt": prompt})
     return PlainTextResponse(content=result)
@@ -1,7 +1,13 @@
+import asyncio
+from typing import Annotated
+
 import bentoml
-from PIL import Image
+from bentoml.validators import ContentType
 
 from genai_services.part1.models import load_image_model
+from genai_services.utils import MicroBatcher, image_array_to_buffer
+
+WebPImage = Annotated[bytes, ContentType("image/webp")]
 
 
 @bentoml.service(
@@ -16,8 +22,23 @@ from genai_services.part1.models import load_image_model
 class ImageGenerationService:
     def __init__(self):
         self.image_model = load_image_model()
+        # Prompts arriving within 100ms are denoised together in one batched pass
+        self.batcher: MicroBatcher[str, bytes] = MicroBatcher(
+            self.generate_image_batch, max_batch_size=4, max_wait_ms=100
+        )
+
+    def _generate_and_encode(self, prompts: list[str]) -> list[bytes]:
+        images = self.image_model(prompts, num_inference_steps=10).images
+        # WebP at method=0 encodes much faster than zlib PNG and is smaller on the wire
+        return [
+            image_array_to_buffer(image, img_format="WEBP", quality=85, method=0)
+            for image in images
+        ]
+
+    async def generate_image_batch(self, prompts: list[str]) -> list[bytes]:
+        """Generate and encode one image per prompt in a single pipeline call."""
+        return await asyncio.to_thread(self._generate_and_encode, prompts)
 
     @bentoml.api(route="/generate/image")
-    def generate_image(self, prompt: str) -> Image.Image:
-        output = self.image_model(prompt, num_inference_steps=10).images[0]
-        return output
+    async def generate_image(self, prompt: str) -> WebPImage:
+        return await self.batcher.submit(prompt)
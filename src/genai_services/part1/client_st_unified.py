@@ -1,5 +1,36 @@
+from collections.abc import Iterator
+
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Create one pooled HTTP session shared across Streamlit reruns."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+    return session
+
+
+def stream_text(prompt: str) -> Iterator[str]:
+    """Yield text chunks from the server-sent events of the streaming endpoint."""
+    with get_session().post(
+        "http://localhost:8000/generate/text/stream",
+        json={"prompt": prompt, "model": "tinyllama", "temperature": 0.01},
+        stream=True,
+        timeout=60,  # 60 seconds timeout
+    ) as response:
+        response.raise_for_status()
+        data_lines: list[str] = []
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if line.startswith("data: "):
+                data_lines.append(line.removeprefix("data: "))
+            elif not line and data_lines:
+                # A blank line ends the event; multi-line data is rejoined with newlines
+                yield "\n".join(data_lines)
+                data_lines = []
+
 
 st.title("FastAPI Multimodal Chatbot")
 
@@ -29,15 +60,12 @@ with tab_text:
     ):
         st.session_state.text_messages.append({"role": "user", "content": prompt})
 
-        # Call the text generation API
-        response = requests.post(
-            "http://localhost:8000/generate/text",
-            json={"prompt": prompt, "model": "tinyllama", "temperature": 0.01},
-            timeout=60,  # 60 seconds timeout
-        )
-        response.raise_for_status()
-        # gather the response from API while treating it as plain text to ensure markdown is rendered correctly
-        assistant_response = response.json()["content"]
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Render tokens as they stream in so the reply starts appearing immediately
+        with st.chat_message("assistant"):
+            assistant_response = st.write_stream(stream_text(prompt))
 
         st.session_state.text_messages.append(
             {"role": "assistant", "content": assistant_response}
@@ -66,7 +94,7 @@ with tab_audio:
         st.session_state.audio_messages.append({"role": "user", "content": prompt})
 
         # Call the audio generation API
-        response = requests.get(
+        response = get_session().get(
             "http://localhost:8000/generate/audio",
             params={"prompt": prompt},
             timeout=60,  # 60 seconds timeout
@@ -101,7 +129,7 @@ with tab_image:
         st.session_state.image_messages.append({"role": "user", "content": prompt})
 
         # Call the image generation API
-        response = requests.get(
+        response = get_session().get(
             "http://localhost:8000/generate/bentoml/image",
             params={"prompt": prompt},
             timeout=60,  # 60 seconds timeout
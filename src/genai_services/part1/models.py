@@ -1,7 +1,14 @@
+import posixpath
+import threading
+from functools import cache
+
 import numpy as np
 import torch
 from accelerate import Accelerator
 from diffusers import DiffusionPipeline, StableDiffusionInpaintPipelineLegacy
+from huggingface_hub import list_repo_files, snapshot_download
+from huggingface_hub.errors import LocalEntryNotFoundError
+from loguru import logger
 from PIL import Image
 from transformers import (
     AutoModel,
@@ -9,6 +16,10 @@ from transformers import (
     BarkModel,
     BarkProcessor,
     Pipeline,
+    PreTrainedTokenizerBase,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
     pipeline,
 )
 
@@ -19,75 +30,224 @@ device = torch.device(
     accelerator.device.type if accelerator.device.type == "mps" else "cpu"
 )
 
+TEXT_MODEL_ID = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+AUDIO_MODEL_ID = "suno/bark-small"
+IMAGE_MODEL_ID = "segmind/tiny-sd"
+
 prompt = "How to set up a FastAPI project?"
 system_prompt = """Your name is FastAPI bot, and are a helpful
 chatbot responsible for teaching FastAPI to your users.
 Always respond in markdown format."""
 
 
+# Weights for other frameworks/runtimes and half-precision variants, which
+# from_pretrained never loads here
+UNUSED_WEIGHT_PATTERNS = [
+    "*.h5",
+    "*.msgpack",
+    "*.onnx",
+    "*.onnx_data",
+    "*.ot",
+    "*.tflite",
+    "*.gguf",
+    "*.ckpt",
+    "*.fp16.*",
+]
+PICKLED_WEIGHT_SUFFIXES = (".bin", ".pt", ".pth")
+
+
+def snapshot_ignore_patterns(repo_files: list[str]) -> list[str]:
+    """Return the files of a model repo that from_pretrained would not load."""
+    # from_pretrained prefers safetensors, so pickled weights next to a
+    # full-precision safetensors file are duplicates; a folder with only
+    # pickled weights (e.g. one diffusers component) keeps them
+    safetensors_dirs = {
+        posixpath.dirname(file)
+        for file in repo_files
+        if file.endswith(".safetensors") and ".fp16." not in file
+    }
+    duplicates = [
+        file
+        for file in repo_files
+        if file.endswith(PICKLED_WEIGHT_SUFFIXES)
+        and posixpath.dirname(file) in safetensors_dirs
+    ]
+    return [*UNUSED_WEIGHT_PATTERNS, *duplicates]
+
+
+def resolve_model_path(repo_id: str) -> str:
+    """Return the local snapshot path of a model, downloading it only if not cached."""
+    try:
+        return snapshot_download(repo_id, local_files_only=True)
+    except LocalEntryNotFoundError:
+        logger.info(f"{repo_id} is not cached locally - downloading snapshot")
+        return snapshot_download(
+            repo_id, ignore_patterns=snapshot_ignore_patterns(list_repo_files(repo_id))
+        )
+
+
 def load_text_model() -> Pipeline:
     """Load the text model and return a pipeline."""
+    # FP16 matmuls are emulated on CPU, so CPU loads FP32 weights and quantizes them
+    on_cpu = device.type == "cpu"
     pipe = pipeline(
         "text-generation",
-        model="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
-        torch_dtype=torch.float16,
+        model=resolve_model_path(TEXT_MODEL_ID),
+        torch_dtype=torch.float32 if on_cpu else torch.float16,
         device=device,
+        model_kwargs={"low_cpu_mem_usage": True},
     )
+    if on_cpu:
+        # INT8 linear layers run on the CPU's integer dot-product units
+        torch.ao.quantization.quantize_dynamic(
+            pipe.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    # Batched generation needs a pad token and left padding for decoder-only models
+    if pipe.tokenizer.pad_token is None:
+        pipe.tokenizer.pad_token = pipe.tokenizer.eos_token
+    pipe.tokenizer.padding_side = "left"
     return pipe
 
 
 def load_audio_model() -> tuple[BarkProcessor, BarkModel]:
     """Load the audio model and return a tuple of processor and model."""
-    processor = AutoProcessor.from_pretrained("suno/bark-small", device=device)
-    model = AutoModel.from_pretrained("suno/bark-small").to(device)
+    model_path = resolve_model_path(AUDIO_MODEL_ID)
+    processor = AutoProcessor.from_pretrained(model_path, device=device)
+    model = AutoModel.from_pretrained(model_path, low_cpu_mem_usage=True).to(device)
     return processor, model
 
 
 def load_image_model() -> StableDiffusionInpaintPipelineLegacy:
     """Load the text to image model and return a tuple of processor and model."""
     pipe = DiffusionPipeline.from_pretrained(
-        "segmind/tiny-sd", device=device, torch_dtype=torch.float32
+        resolve_model_path(IMAGE_MODEL_ID), device=device, torch_dtype=torch.float32
     )
     return pipe
 
 
+@cache
+def chat_template_affixes(tokenizer: PreTrainedTokenizerBase) -> tuple[str, str]:
+    """Render the chat template once and split it around the user message."""
+    sentinel = "<<USER_PROMPT>>"
+    rendered = tokenizer.apply_chat_template(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": sentinel},
+        ],
+        tokenize=False,
+        add_generation_prompt=True,
+    )
+    prefix, suffix = rendered.split(sentinel)
+    return prefix, suffix
+
+
+def sampling_kwargs(
+    tokenizer: PreTrainedTokenizerBase, temperature: float, top_p: float
+) -> dict:
+    """Return the generation settings shared by batched and streamed text generation."""
+    return {
+        "max_new_tokens": 256,
+        "temperature": temperature,
+        "do_sample": True,
+        "top_k": 50,
+        "top_p": top_p,
+        "num_beams": 1,
+        "use_cache": True,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+
+
 def generate_text(
     pipe: Pipeline, prompt: str, temperature: float = 0.7, top_p: float = 0.95
-) -> str:
-    """Generate text using the model."""
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": prompt},
-    ]
+) -> tuple[str, int]:
+    """Generate text using the model and return it with its generated token count."""
+    return generate_texts(pipe, [prompt], temperature, top_p)[0]
 
-    prompt = pipe.tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True,
+
+def generate_texts(
+    pipe: Pipeline, prompts: list[str], temperature: float = 0.7, top_p: float = 0.95
+) -> list[tuple[str, int]]:
+    """Generate text and token counts for several prompts in one batched forward pass."""
+    prefix, suffix = chat_template_affixes(pipe.tokenizer)
+    chat_prompts = [prefix + prompt + suffix for prompt in prompts]
+
+    tokenizer = pipe.tokenizer
+    inputs = tokenizer(chat_prompts, padding=True, return_tensors="pt").to(
+        pipe.model.device
     )
 
-    preds = pipe(
-        prompt,
-        max_new_tokens=256,
-        temperature=temperature,
-        do_sample=True,
-        top_k=50,
-        top_p=top_p,
+    # inference_mode skips autograd version counters and view tracking per decode step
+    with torch.inference_mode():
+        output_ids = pipe.model.generate(
+            **inputs, **sampling_kwargs(tokenizer, temperature, top_p)
+        )
+    # Left padding aligns every prompt to the same length, so only new tokens get decoded
+    new_ids = output_ids[:, inputs["input_ids"].shape[1] :]
+    texts = tokenizer.batch_decode(new_ids, skip_special_tokens=True)
+    # Sequences that stop early are padded out, so padding is excluded from the count
+    counts = (new_ids != tokenizer.pad_token_id).sum(dim=1).tolist()
+    return list(zip(texts, counts, strict=True))
+
+
+class StopOnEvent(StoppingCriteria):
+    """Stop generation once the event is set, e.g. when the client disconnects."""
+
+    def __init__(self, stop_event: threading.Event) -> None:
+        self.stop_event = stop_event
+
+    def __call__(
+        self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
+    ) -> torch.BoolTensor:
+        return torch.full(
+            (input_ids.shape[0],),
+            self.stop_event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+def stream_text(
+    pipe: Pipeline,
+    prompt: str,
+    streamer: TextIteratorStreamer,
+    temperature: float = 0.7,
+    top_p: float = 0.95,
+    stop_event: threading.Event | None = None,
+) -> None:
+    """Generate text for a single prompt, pushing decoded tokens into the streamer."""
+    prefix, suffix = chat_template_affixes(pipe.tokenizer)
+    inputs = pipe.tokenizer(prefix + prompt + suffix, return_tensors="pt").to(
+        pipe.model.device
     )
-    output = preds[0]["generated_text"].split("</s>\n<|assistant|>\n")[-1]
-    return output
+    try:
+        with torch.inference_mode():
+            pipe.model.generate(
+                **inputs,
+                **sampling_kwargs(pipe.tokenizer, temperature, top_p),
+                streamer=streamer,
+                # Checked after every token, so an abandoned stream frees the worker
+                stopping_criteria=StoppingCriteriaList(
+                    [StopOnEvent(stop_event)] if stop_event else []
+                ),
+            )
+    except Exception:
+        # Unblock the consumer instead of leaving it waiting on the streamer queue
+        streamer.end()
+        raise
 
 
 def generate_audio(
     processor: BarkProcessor, model: BarkModel, prompt: str, preset: VoicePresets
-) -> tuple[np.array, int]:
+) -> tuple[np.ndarray, int]:
     """Generate audio using the model and return the audio array and the number of tokens."""
     inputs = processor(text=[prompt], return_tensors="pt", voice_preset=preset)
     # Move inputs to the same device as the model
     inputs = {
         k: v.to(model.device) if hasattr(v, "to") else v for k, v in inputs.items()
     }
-    output = model.generate(**inputs, do_sample=True).cpu().numpy().squeeze()
+    # Index the batch dimension on the tensor: the numpy conversion below is a view
+    with torch.inference_mode():
+        output = model.generate(**inputs, do_sample=True)[0].cpu().numpy()
     sample_rate = model.generation_config.sample_rate
     return output, sample_rate
 
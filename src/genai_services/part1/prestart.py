@@ -0,0 +1,49 @@
+"""Fetch model snapshots once, then serve the part1 API with multiple workers.
+
+Every worker resolves its weights from the same Hugging Face cache with the hub
+in offline mode, so no worker re-downloads or revalidates files on boot and the
+memory-mapped safetensors files share a single copy in the OS page cache.
+
+Usage: `uv run python -m genai_services.part1.prestart --workers 4`
+"""
+
+import argparse
+import os
+
+import uvicorn
+from loguru import logger
+
+from genai_services.part1.models import (
+    AUDIO_MODEL_ID,
+    TEXT_MODEL_ID,
+    resolve_model_path,
+)
+
+
+def prefetch_models() -> None:
+    """Make sure every model served by the API is in the local cache."""
+    for repo_id in (TEXT_MODEL_ID, AUDIO_MODEL_ID):
+        logger.info(f"Resolved {repo_id} to {resolve_model_path(repo_id)}")
+
+
+def main() -> None:
+    """Prefetch the models and start uvicorn workers that load them offline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    prefetch_models()
+    # Inherited by the worker processes: load strictly from the prefetched cache
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    uvicorn.run(
+        "genai_services.part1.api_main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
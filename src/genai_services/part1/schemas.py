@@ -1,6 +1,7 @@
+import secrets
 from datetime import datetime
-from typing import Annotated, Literal
-from uuid import uuid4
+from itertools import count
+from typing import Annotated, Literal, Self
 
 from pydantic import (
     AfterValidator,
@@ -10,6 +11,7 @@ from pydantic import (
     IPvAnyAddress,
     PositiveInt,
     computed_field,
+    model_validator,
     validate_call,
 )
 
@@ -36,17 +38,26 @@ def validate_text_model(v: str) -> str:
 
 SupportedTextModels = Annotated[str, AfterValidator(validate_text_model)]
 
+# A random per-process prefix plus a counter keeps ids unique without a urandom read each
+_request_id_prefix = secrets.token_hex(6)
+_request_id_counter = count()
+
+
+def next_request_id() -> str:
+    """Return a process-unique request id."""
+    return f"{_request_id_prefix}-{next(_request_id_counter):x}"
+
 
 class ModelRequest(BaseModel):
     prompt: Annotated[str, Field(min_length=1, max_length=1000)]
 
 
 class ModelResponse(BaseModel):
-    request_id: Annotated[str, Field(default_factory=lambda: uuid4().hex)]
+    request_id: Annotated[str, Field(default_factory=next_request_id)]
     # No default value for ip to allow for None - raise validation error if None or no valid IP address is provided
     ip: Annotated[str, IPvAnyAddress] | None
     content: Annotated[str | None, Field(min_length=0, max_length=100000)]
-    created_at: datetime = datetime.now()
+    created_at: Annotated[datetime, Field(default_factory=datetime.now)]
 
 
 class TextModelRequest(ModelRequest):
@@ -75,13 +86,21 @@ class TextModelResponse(ModelResponse):
         ),
     ]
 
-    @computed_field
-    def tokens(self) -> int:
-        return count_tokens(self.content)
+    tokens: Annotated[
+        int | None,
+        Field(ge=0, default=None, description="Number of generated tokens"),
+    ]
+
+    @model_validator(mode="after")
+    def fill_missing_tokens(self) -> Self:
+        """Estimate tokens from the content only when the generator did not report them."""
+        if self.tokens is None and self.content is not None:
+            self.tokens = count_tokens(self.content)
+        return self
 
     @computed_field
     def price(self) -> float:
-        return self.tokens * self.rate
+        return (self.tokens or 0) * self.rate
 
 
 ImageSize = Annotated[
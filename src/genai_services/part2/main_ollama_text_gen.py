@@ -1,13 +1,38 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import Body, FastAPI, Request
+from fastapi.responses import ORJSONResponse
 
 from genai_services.part1.schemas import TextModelRequest, TextModelResponse
 from genai_services.part2.ollama_async_model_serving import (
     LOCAL_CONFIG,
+    REQUEST_TIMEOUT,
     generate_text_completion,
 )
 from genai_services.utils import normalize_text
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # One client for the app lifetime so Ollama connections are kept alive and
+    # reused; against TLS endpoints HTTP/2 multiplexes requests over one connection.
+    # Ollama schedules concurrent requests itself, so each one is sent as it arrives
+    app.state.http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=100, max_keepalive_connections=32, keepalive_expiry=75.0
+        ),
+    )
+
+    yield
+
+    await app.state.http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 _body_default = Body(..., description="Text model request")
 
@@ -23,6 +48,7 @@ async def serve_text_to_text_controller(
         config=LOCAL_CONFIG,
         use_cloud=False,
         temperature=body.temperature,
+        client=request.app.state.http_client,
     )
     return TextModelResponse(
         content=normalize_text(output),
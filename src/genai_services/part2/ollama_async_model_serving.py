@@ -1,19 +1,29 @@
 """
 Ollama async model serving for local and cloud inference.
 
-Simple functional approach for text generation using aiohttp.
+Simple functional approach for text generation using httpx (HTTP/2 where the
+endpoint negotiates it over TLS).
 Supports both local (localhost:11434) and cloud (ollama.com) endpoints.
 """
 
+from collections.abc import Callable
+from functools import partial, reduce
+from operator import getitem
 from typing import Any, Self
 
-import aiohttp
-from aiohttp import ClientResponse
+import httpx
+import orjson
 from loguru import logger
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
 
 from genai_services.settings import settings
 
+SYSTEM_PROMPT = "You are a helpful assistant."
+# Shared by every request payload; it is only ever serialised, never mutated
+SYSTEM_MESSAGE: dict[str, str] = {"role": "system", "content": SYSTEM_PROMPT}
+# Generation can take far longer than httpx's 5s default
+REQUEST_TIMEOUT = httpx.Timeout(120.0)
+
 
 class OllamaEndpointConfig(BaseModel):
     """Immutable configuration for an Ollama endpoint."""
@@ -30,6 +40,8 @@ class OllamaEndpointConfig(BaseModel):
     response_path: tuple[str | int, ...] = Field(
         description="JSON path to extract content from response"
     )
+    _headers: dict[str, str] = PrivateAttr(default_factory=dict)
+    _extractor: Callable[[dict[str, Any]], Any] = PrivateAttr()
 
     @model_validator(mode="after")
     def validate_default_model_in_allowed(self) -> Self:
@@ -41,6 +53,25 @@ class OllamaEndpointConfig(BaseModel):
             )
         return self
 
+    @model_validator(mode="after")
+    def build_headers(self) -> Self:
+        """Precompute the request headers, including auth, once per endpoint."""
+        self._headers = {"Content-Type": "application/json"}
+        if self.requires_auth:
+            self._headers["Authorization"] = f"Bearer {settings.ollama_api_key}"
+        return self
+
+    @model_validator(mode="after")
+    def build_extractor(self) -> Self:
+        """Bind the response path into a C-level chain of getitem calls."""
+        self._extractor = partial(reduce, getitem, self.response_path)
+        return self
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Request headers for this endpoint."""
+        return self._headers
+
     @property
     def url(self) -> str:
         """Construct the full endpoint URL."""
@@ -63,10 +94,7 @@ class OllamaEndpointConfig(BaseModel):
 
     def extract_content(self, response: dict[str, Any]) -> str:
         """Extract content from response using configured path."""
-        result: Any = response
-        for key in self.response_path:
-            result = result[key]
-        return result
+        return self._extractor(response)
 
 
 LOCAL_CONFIG = OllamaEndpointConfig(
@@ -97,6 +125,19 @@ CLOUD_CONFIG = OllamaEndpointConfig(
 )
 
 
+async def _post_json(
+    client: httpx.AsyncClient,
+    url: str,
+    data: dict[str, Any],
+    headers: dict[str, str],
+) -> dict[str, Any]:
+    """POST a JSON payload and return the decoded JSON response."""
+    # orjson encodes/decodes in C; the Content-Type header comes from the config
+    response = await client.post(url, content=orjson.dumps(data), headers=headers)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
 async def generate_text_completion(
     prompt: str,
     model: str,
@@ -104,6 +145,7 @@ async def generate_text_completion(
     use_cloud: bool = False,
     temperature: float = 0.01,
     stream: bool = False,
+    client: httpx.AsyncClient | None = None,
 ) -> str:
     """Generate text completion from Ollama.
 
@@ -115,6 +157,7 @@ async def generate_text_completion(
         - use_cloud: If `True`, use Ollama cloud endpoint with API key (backwards compatibility)
         - temperature: Temperature for generation (0.0 to 1.0)
         - stream: If `True`, return streaming response (not implemented in this function)
+        - client: Shared HTTP client to reuse pooled connections (a temporary one is created if omitted)
 
     Returns
     --------
@@ -159,15 +202,9 @@ async def generate_text_completion(
             f"Model {model_name} is not allowed for this endpoint, allowed models: {config.allowed_models}"
         ) from e
 
-    # Build headers
-    headers: dict[str, str] = {"Content-Type": "application/json"}
-    if config.requires_auth:
-        headers["Authorization"] = f"Bearer {settings.ollama_api_key}"
-
     # Build request payload
-    system_prompt = "You are a helpful assistant."
     messages: list[dict[str, str]] = [
-        {"role": "system", "content": system_prompt},
+        SYSTEM_MESSAGE,
         {"role": "user", "content": prompt},
     ]
 
@@ -179,13 +216,16 @@ async def generate_text_completion(
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            response: ClientResponse = await session.post(
-                config.url, json=data, headers=headers
-            )
-            response.raise_for_status()  # type: ignore
-            predictions = await response.json()  # type: ignore
-    except aiohttp.ClientError as e:
+        if client is None:
+            async with httpx.AsyncClient(
+                http2=True, timeout=REQUEST_TIMEOUT
+            ) as temporary_client:
+                predictions = await _post_json(
+                    temporary_client, config.url, data, config.headers
+                )
+        else:
+            predictions = await _post_json(client, config.url, data, config.headers)
+    except httpx.HTTPError as e:
         logger.error(f"HTTP error during text generation: {e}")
         raise
     except Exception as e:
@@ -4,6 +4,7 @@ from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
 from fastapi import Body, Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse
 
 from genai_services.part1.models import generate_text, load_text_model
 from genai_services.part1.schemas import TextModelRequest, TextModelResponse
@@ -21,7 +22,10 @@ models = {}
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     models["text"] = load_text_model()
-    scraper = WebScraper()
+    # One session for the app lifetime keeps connections, keep-alive and DNS
+    # cache warm for every scraper that handles requests
+    app.state.http_session = WebScraper.create_session()
+    scraper = WebScraper(session=app.state.http_session)
     await scraper.__aenter__()
     app.state.scraper = scraper
 
@@ -29,11 +33,12 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     await scraper.__aexit__(None, None, None)
     app.state.scraper = None
+    await app.state.http_session.close()
 
     models.clear()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 @app.post("/generate/scrape/text", response_model_exclude_defaults=True)
@@ -57,10 +62,11 @@ async def scrape_text(
             combined_prompt[:max_chars] + "\n\n[Context truncated due to length]"
         )
 
-    output: str = generate_text(pipe, combined_prompt, body.temperature)
+    output, tokens = generate_text(pipe, combined_prompt, body.temperature)
     return TextModelResponse(
         ip=request.client.host if request.client else None,
         content=normalize_text(output),
+        tokens=tokens,
         model=body.model,
         temperature=body.temperature,
     )
@@ -1,4 +1,7 @@
+import multiprocessing
+import os
 from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Annotated
 
@@ -13,15 +16,21 @@ from fastapi import (
     UploadFile,
     status,
 )
+from fastapi.responses import ORJSONResponse
 from loguru import logger
 from transformers import Pipeline
 
 from genai_services.part1.models import generate_text, load_text_model
 from genai_services.part1.schemas import TextModelRequest, TextModelResponse
-from genai_services.utils import normalize_text
+from genai_services.utils import DEFAULT_CHUNK_SIZE, BufferPool, normalize_text
 
-from .dependencies import get_rag_content
-from .extractor import pdf_text_extractor
+from .dependencies import (
+    get_rag_content,
+    get_vector_service,
+    query_embedding_cache,
+)
+from .extractor import extract_pdf_text
+from .transform import get_embedder
 from .upload import save_file
 from .vector_service import VectorDBService
 
@@ -29,23 +38,46 @@ _body_default = Body(..., description="Text model request")
 
 models: dict[str, Pipeline] = {}
 
+# Half the cores for PDF extraction, leaving the rest to the text model, the
+# embedder and the event loop
+PDF_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     models["text"] = load_text_model()
+    # Loading here rather than at import keeps module imports cheap and makes the
+    # first upload/query skip the weight load
+    get_embedder()
+    # One preallocated 1 MiB buffer per concurrent upload copy
+    app.state.upload_buffers = BufferPool(size=8, buffer_size=DEFAULT_CHUNK_SIZE)
+    # One Qdrant client for the app lifetime instead of a new pool per request
+    app.state.vector_service = VectorDBService()
+    # PDF extraction runs in worker processes so it never blocks the event loop.
+    # Spawned rather than forked: forking would copy the loaded torch state and
+    # its thread pools into every worker, which only needs pypdf
+    app.state.pdf_pool = ProcessPoolExecutor(
+        max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
 
     yield
 
+    # Don't block the event loop waiting for workers that are mid-extraction
+    app.state.pdf_pool.shutdown(wait=False, cancel_futures=True)
+    await app.state.vector_service.db_client.close()
     models.clear()
+    query_embedding_cache.clear()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 @app.post("/upload")
 async def file_upload_controller(
+    request: Request,
     file: Annotated[UploadFile, File(description="Uploaded PDF documents.")],
     bg_text_processor: BackgroundTasks,
+    vector_service: Annotated[VectorDBService, Depends(get_vector_service)],
 ):
     if file.content_type != "application/pdf":
         raise HTTPException(
@@ -53,10 +85,11 @@ async def file_upload_controller(
             detail="File must be a PDF",
         ) from Exception("File must be a PDF")
     try:
-        filepath: str = str(await save_file(file))
-        bg_text_processor.add_task(pdf_text_extractor, filepath)
+        filepath: str = str(await save_file(file, request.app.state.upload_buffers))
+        bg_text_processor.add_task(
+            extract_pdf_text, filepath, request.app.state.pdf_pool, PDF_WORKERS
+        )
         logger.info(f"File {filepath} uploaded successfully")
-        vector_service = VectorDBService()
         bg_text_processor.add_task(
             vector_service.store_file_content_in_db,
             filepath.replace("pdf", "txt"),
@@ -86,9 +119,10 @@ async def generate_text_controller(
     try:
         pipe: Pipeline = models["text"]
         prompt: str = body.prompt + " " + rag_content
-        output: str = generate_text(pipe, prompt, body.temperature)
+        output, tokens = generate_text(pipe, prompt, body.temperature)
         return TextModelResponse(
             content=normalize_text(output),
+            tokens=tokens,
             ip=request.client.host if request.client else None,
             model=body.model,
         )
@@ -1,8 +1,19 @@
 from typing import Any
 
-import requests
+import httpx
+import orjson
 import streamlit as st
-from requests import Response
+
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """Create one pooled HTTP client shared across Streamlit reruns."""
+    return httpx.Client(
+        base_url="http://localhost:8000",
+        timeout=120,
+        limits=httpx.Limits(max_keepalive_connections=10),
+    )
+
 
 st.title("FastAPI PDF ChatBot")
 
@@ -15,9 +26,7 @@ file = st.file_uploader("Upload a PDF file", type=["pdf"])
 if st.button("Submit"):
     if file is not None:
         files: dict[str, tuple[Any, Any, str]] = {"file": (file.name, file, file.type)}
-        response: Response = requests.post(
-            "http://localhost:8000/upload", files=files, timeout=30
-        )
+        response: httpx.Response = get_client().post("/upload", files=files, timeout=30)
         st.write(response.text)
     else:
         st.write("Please upload a PDF file")
@@ -37,24 +46,23 @@ if prompt := st.chat_input("Write your prompt"):
     with st.chat_message("assistant"):
         with st.spinner("Generating response..."):
             try:
-                response = requests.post(
-                    "http://localhost:8000/generate/text",
+                response = get_client().post(
+                    "/generate/text",
                     json={
                         "prompt": prompt,
                         "model": "tinyllama",
                         "temperature": 0.01,
                     },
-                    timeout=120,
                 )
                 response.raise_for_status()
-                response_data = response.json()
+                response_data = orjson.loads(response.content)
                 assistant_content = response_data.get("content", "")
 
                 st.markdown(assistant_content)
                 st.session_state.rag_messages.append(
                     {"role": "assistant", "content": assistant_content}
                 )
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 error_msg = "⏱️ Request timed out. The generation took too long."
                 st.error(error_msg)
                 st.session_state.rag_messages.append(
@@ -1,31 +1,65 @@
-from fastapi import Body
+import asyncio
+from collections.abc import Iterator
+from typing import Annotated
+
+from fastapi import Body, Depends, Request
+from loguru import logger
+from qdrant_client.http.models import ScoredPoint
 
 from genai_services.part1.schemas import TextModelRequest
+from genai_services.utils import LRUCache
 
 from .transform import clean, embed
 from .vector_service import VectorDBService
 
 _body_default = Body(..., description="Text model request")
 
+# Retries and repeated questions skip the embedding forward pass; a prompt's
+# embedding only changes with the model, so entries can live for a day
+query_embedding_cache: LRUCache[list[float]] = LRUCache(maxsize=1024, ttl=86400)
+# Retrieved context appended to the prompt; TinyLlama's 2048-token window fits
+# the prompt, this context (~4 chars per token) and the generated answer
+MAX_RAG_CHARS = 4000
+
+
+def get_vector_service(request: Request) -> VectorDBService:
+    """Get the vector database service shared across the app."""
+    return request.app.state.vector_service
+
 
 async def get_rag_content(
+    vector_service: Annotated[VectorDBService, Depends(get_vector_service)],
     body: TextModelRequest = _body_default,
 ) -> str:
     """Get RAG content from the vector database."""
-    vector_service = VectorDBService()
     cleaned_prompt = clean(body.prompt)
-    embedding_vector: list[float] = embed(cleaned_prompt)
+    embedding_vector = query_embedding_cache.get(cleaned_prompt)
+    if embedding_vector is None:
+        # The forward pass is CPU-bound, so it runs off the event loop
+        embeddings = await asyncio.to_thread(embed, [cleaned_prompt])
+        embedding_vector = embeddings[0].tolist()
+        query_embedding_cache.set(cleaned_prompt, embedding_vector)
+    logger.debug(
+        f"Query embedding cache hit rate: {query_embedding_cache.hit_rate:.1%}"
+    )
     rag_content = await vector_service.search(
         collection_name="knowledgebase",
         query_vector=embedding_vector,
         retrieval_limit=3,
         score_threshold=0.7,
     )
-    rag_content_str: str = "\n".join(
-        [
-            result.payload["original_text"]
-            for result in rag_content
-            if result.payload is not None
-        ]
-    )
-    return rag_content_str
+    return "\n".join(_iter_rag_texts(rag_content, MAX_RAG_CHARS))
+
+
+def _iter_rag_texts(results: list[ScoredPoint], max_chars: int) -> Iterator[str]:
+    """Yield retrieved texts in rank order until the character budget is spent."""
+    remaining = max_chars
+    for result in results:
+        if result.payload is None:
+            continue
+        text: str = result.payload["original_text"]
+        # Cut the last text to the budget so an oversized chunk can't overflow it
+        yield text[:remaining]
+        remaining -= len(text)
+        if remaining <= 0:
+            break
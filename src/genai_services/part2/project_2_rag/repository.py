@@ -1,9 +1,10 @@
+import uuid
+
 from loguru import logger
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import (
     CollectionsResponse,
-    CountResult,
     QueryResponse,
     ScoredPoint,
 )
@@ -12,13 +13,26 @@ from qdrant_client.http.models import (
 class VectorDBRepository:
     """Repository for vector database operations."""
 
-    def __init__(self, host: str = "localhost", port: int = 6333) -> None:
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6333,
+        pool_size: int = 100,
+        prefer_grpc: bool = False,
+    ) -> None:
         """Initialize the vector database client."""
-        self.db_client = AsyncQdrantClient(host=host, port=port)
+        # A large pool lets concurrent searches and batched upserts share one
+        # client; gRPC is opt-in because it needs Qdrant's gRPC port exposed
+        self.db_client = AsyncQdrantClient(
+            host=host, port=port, pool_size=pool_size, prefer_grpc=prefer_grpc
+        )
 
     async def create_collection(self, collection_name: str, size: int) -> bool:
         """Create a new collection in the vector database."""
-        vectors_config = models.VectorParams(size=size, distance=models.Distance.COSINE)
+        # Vectors are produced in FP16, so Qdrant stores them at half the size too
+        vectors_config = models.VectorParams(
+            size=size, distance=models.Distance.COSINE, datatype=models.Datatype.FLOAT16
+        )
 
         response: CollectionsResponse = await self.db_client.get_collections()
 
@@ -52,27 +66,42 @@ class VectorDBRepository:
         source: str,
     ) -> None:
         """Create a new vector in the vector database."""
-        response: CountResult = await self.db_client.count(
-            collection_name=collection_name
+        await self.create_many(
+            collection_name, [embedding_vector], [original_text], source
         )
+
+    async def create_many(
+        self,
+        collection_name: str,
+        embedding_vectors: list[list[float]],
+        original_texts: list[str],
+        source: str,
+    ) -> None:
+        """Create a batch of vectors in the vector database in one upsert."""
         logger.debug(
-            f"Creating a new vector with ID {response.count}"
-            f"in collection {collection_name}"
+            f"Creating {len(embedding_vectors)} vectors in collection {collection_name}"
         )
+        # Client-side UUIDs replace the count() lookup per point, which cost a
+        # round trip and could hand two concurrent writers the same ID
         await self.db_client.upsert(
             collection_name=collection_name,
             points=[
                 models.PointStruct(
-                    id=response.count,
+                    id=str(uuid.uuid4()),
                     vector=embedding_vector,
                     payload={
                         "original_text": original_text,
                         "source": source,
                     },
                 )
+                for embedding_vector, original_text in zip(
+                    embedding_vectors, original_texts, strict=True
+                )
             ],
+            # Ingestion runs in the background, so don't block on indexing
+            wait=False,
         )
-        logger.debug("Vector created successfully")
+        logger.debug("Vectors created successfully")
 
     async def search(
         self,
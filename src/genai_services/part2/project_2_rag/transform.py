@@ -1,38 +1,96 @@
-import re
+import asyncio
+import threading
 from collections.abc import AsyncGenerator
+from functools import cache
 from typing import Any
 
-import aiofiles
-from transformers import AutoModel
+import numpy as np
+from transformers import AutoModel, PreTrainedModel
 
-DEFAULT_CHUNK_SIZE: int = 1024 * 1024 * 50  # 50MB
+from genai_services.utils import DEFAULT_CHUNK_SIZE
 
-embedder = AutoModel.from_pretrained(
-    "jinaai/jina-embeddings-v2-base-en",
-    trust_remote_code=True,
-)
+EMBEDDING_MODEL_ID = "jinaai/jina-embeddings-v2-base-en"
+
+
+@cache
+def get_embedder() -> PreTrainedModel:
+    """Load the embedding model on first use and reuse it afterwards."""
+    return AutoModel.from_pretrained(EMBEDDING_MODEL_ID, trust_remote_code=True)
+
+
+_END_OF_FILE = object()
+
+
+def _read_chunks(
+    filepath: str,
+    chunk_size: int,
+    queue: asyncio.Queue,
+    loop: asyncio.AbstractEventLoop,
+    stop: threading.Event,
+) -> None:
+    """Read the file on a worker thread and hand lists of chunks to the event loop."""
+    # Decode whole multiples of chunk_size at a time so one hop carries many chunks
+    block_size = max(1, DEFAULT_CHUNK_SIZE // chunk_size) * chunk_size
+    result: object = _END_OF_FILE
+    try:
+        with open(filepath, encoding="utf-8") as f:
+            while not stop.is_set() and (block := f.read(block_size)):
+                chunks = [
+                    block[start : start + chunk_size]
+                    for start in range(0, len(block), chunk_size)
+                ]
+                asyncio.run_coroutine_threadsafe(queue.put(chunks), loop).result()
+    except Exception as e:
+        result = e
+    asyncio.run_coroutine_threadsafe(queue.put(result), loop).result()
 
 
 async def load(
     filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE
 ) -> AsyncGenerator[str, Any]:
     """Load a file and return its content as a string."""
-    async with aiofiles.open(filepath, encoding="utf-8") as f:
-        while chunk := await f.read(chunk_size):
-            yield chunk
+    loop = asyncio.get_running_loop()
+    # A small bound gives backpressure so the reader never runs far ahead
+    queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+    stop = threading.Event()
+    reader = loop.run_in_executor(
+        None, _read_chunks, filepath, chunk_size, queue, loop, stop
+    )
+    try:
+        while (item := await queue.get()) is not _END_OF_FILE:
+            if isinstance(item, Exception):
+                raise item
+            for chunk in item:
+                yield chunk
+    finally:
+        # Unblock a reader waiting on a full queue if the consumer stops early
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
+        await reader
 
 
 def clean(text: str) -> str:
     """Clean the text of the file."""
-    t = text.replace("\n", " ")  # replace newlines with a space
-    t = re.sub(r"\s+", " ", t)  # replace multiple spaces with a single space
-    t = re.sub(r"\. ,", "", t)  # remove periods and commas
+    # split/join collapses every whitespace run (newlines included) in C
+    t = " ".join(text.split())
+    # The replaces run in this order on purpose: each one can create or consume
+    # the pattern of the next, so a fused single pass gives different output
+    t = t.replace(". ,", "")  # remove periods and commas
     t = t.replace("..", ".")  # remove double periods
     t = t.replace(". .", ".")  # remove double periods
-    cleaned_text = t.replace("\n", " ").strip()  # remove newlines and strip whitespace
-    return cleaned_text
+    # Dropping a ". ," at either end can expose a space, hence the final strip
+    return t.strip()
 
 
-def embed(text: str) -> list[float]:
-    """Embed the text using the embedder."""
-    return embedder.encode(text).tolist()
+def embed(texts: list[str], batch_size: int = 32) -> np.ndarray:
+    """Embed the texts in batched forward passes, returning one FP16 row per text."""
+    embeddings = get_embedder().encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    # Unit vectors lose ~1e-3 relative precision in FP16, which is negligible for
+    # cosine ranking and halves the bytes moved and stored per vector
+    return embeddings.astype(np.float16)
@@ -1,22 +1,31 @@
+import asyncio
 from pathlib import Path
+from typing import BinaryIO
 
-import aiofiles
-from aiofiles.os import makedirs
 from fastapi import UploadFile
 
-DEFAULT_CHUNK_SIZE = 1024 * 1024 * 50  # 50MB
+from genai_services.utils import BufferPool
 
 UPLOAD_DIR = Path(__file__).parent / "uploads"
 
 
-async def save_file(file: UploadFile) -> Path:
+def _copy_to_disk(source: BinaryIO, filepath: Path, buffer: bytearray) -> None:
+    """Copy a spooled upload to disk through a reusable buffer in one blocking pass."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    source.seek(0)
+    view = memoryview(buffer)
+    with open(filepath, "wb") as destination:
+        # readinto fills the pooled buffer, so no bytes object is allocated per chunk
+        while read := source.readinto(view):
+            destination.write(view[:read])
+
+
+async def save_file(file: UploadFile, buffer_pool: BufferPool) -> Path:
     """Save an uploaded file to a specified path asynchronously."""
-    await makedirs(UPLOAD_DIR, exist_ok=True)
     filepath = (
         UPLOAD_DIR / file.filename if file.filename else UPLOAD_DIR / "unnamed.txt"
     )
-    async with aiofiles.open(filepath, "wb") as f:
-        while chunk := await file.read(DEFAULT_CHUNK_SIZE):
-            await f.write(chunk)
-
+    async with buffer_pool.acquire() as buffer:
+        # One thread hop for the whole copy is cheaper than awaiting every chunk
+        await asyncio.to_thread(_copy_to_disk, file.file, filepath, buffer)
     return filepath
@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 from loguru import logger
@@ -9,9 +10,15 @@ from genai_services.part2.project_2_rag.transform import clean, embed, load
 class VectorDBService(VectorDBRepository):
     """Service for vector database operations."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6333,
+        pool_size: int = 100,
+        prefer_grpc: bool = False,
+    ) -> None:
         """Initialize the vector database client."""
-        super().__init__()
+        super().__init__(host, port, pool_size, prefer_grpc)
 
     async def store_file_content_in_db(
         self,
@@ -19,19 +26,34 @@ class VectorDBService(VectorDBRepository):
         chunk_size: int = 512,
         collection_name: str = "knowledgebase",
         collection_size: int = 768,
+        embed_batch_size: int = 64,
     ) -> None:
         """Store the content of a file in the vector database."""
         await self.create_collection(collection_name, collection_size)
         logger.info(f"Inserting content of {filepath} into database")
+        filename: str = os.path.basename(filepath)
+        batch: list[str] = []
         async for chunk in load(filepath, chunk_size):
-            logger.info(f"Inserting chunk of {chunk[0:20]} characters into database")
-
-            embedding_vector: list[float] = embed(clean(chunk))
-            filename: str = os.path.basename(filepath)
-            await self.create(
-                collection_name=collection_name,
-                embedding_vector=embedding_vector,
-                original_text=chunk,
-                source=filename,
-            )
+            batch.append(chunk)
+            if len(batch) == embed_batch_size:
+                await self._store_chunks(batch, collection_name, filename)
+                batch = []
+        if batch:
+            await self._store_chunks(batch, collection_name, filename)
         logger.success(f"Content of {filepath} inserted into database")
+
+    async def _store_chunks(
+        self, chunks: list[str], collection_name: str, source: str
+    ) -> None:
+        """Embed a batch of chunks in one forward pass and insert them in one upsert."""
+        logger.info(f"Inserting batch of {len(chunks)} chunks into database")
+        # The forward pass is CPU-bound, so it runs off the event loop
+        embedding_vectors = await asyncio.to_thread(
+            embed, [clean(chunk) for chunk in chunks], len(chunks)
+        )
+        await self.create_many(
+            collection_name=collection_name,
+            embedding_vectors=embedding_vectors.tolist(),
+            original_texts=chunks,
+            source=source,
+        )
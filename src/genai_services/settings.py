@@ -29,6 +29,8 @@ class AppSettings(BaseSettings):
         str, Field(alias="OPENAI_API_KEY", pattern=r"^sk-proj-.*$")
     ]
     ollama_api_key: Annotated[str, Field(alias="OLLAMA_API_KEY")]
+    # run a dummy inference per model at startup so the first request isn't slow
+    warmup: Annotated[bool, Field(alias="WARMUP", default=False)]
 
 
 settings = AppSettings()
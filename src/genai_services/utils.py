@@ -1,33 +1,80 @@
+import asyncio
 import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable, Iterator
+from contextlib import asynccontextmanager
 from io import BytesIO
-from typing import Literal
+from typing import Any, Generic, Literal, TypeVar
 
 import numpy as np
-import soundfile
+from loguru import logger
 from PIL import Image
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 1 MiB, page-aligned: large enough to amortise per-read overhead, small enough
+# to stream and to stay cache- and GC-friendly
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# C0/C1 control characters; whitespace controls are collapsed before this runs
+CONTROL_CHARS_PATTERN = re.compile(r"[\x00-\x1f\x7f-\x9f]+")
 
-def audio_array_to_buffer(audio_array: np.array, sample_rate: int) -> BytesIO:
-    """Convert an audio array to a buffer."""
-    buffer = BytesIO()
-    # Specify format explicitly for BytesIO objects
-    soundfile.write(buffer, audio_array, sample_rate, format="wav")
-    buffer.seek(0)
-    return buffer
+
+def audio_array_to_wav_chunks(
+    audio_array: np.ndarray, sample_rate: int, chunk_seconds: float = 0.5
+) -> Iterator[bytes]:
+    """Encode a mono audio array as 16-bit PCM WAV, yielding the header then frames."""
+    num_frames = len(audio_array)
+    data_size = num_frames * 2
+    yield struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt chunk size
+        1,  # PCM
+        1,  # mono
+        sample_rate,
+        sample_rate * 2,  # byte rate
+        2,  # block align
+        16,  # bits per sample
+        b"data",
+        data_size,
+    )
+    step = max(1, int(sample_rate * chunk_seconds))
+    for start in range(0, num_frames, step):
+        # Scale into one temporary and clip it in place before the int16 cast
+        frame = np.multiply(audio_array[start : start + step], 32767.0)
+        np.clip(frame, -32767.0, 32767.0, out=frame)
+        yield frame.astype("<i2").tobytes()
 
 
 def image_array_to_buffer(
-    image_array: Image.Image, img_format: Literal["PNG", "JPEG"] = "PNG"
+    image_array: Image.Image,
+    img_format: Literal["PNG", "JPEG", "WEBP"] = "PNG",
+    **save_options: Any,
 ) -> bytes:
     """Convert an image array to a buffer."""
     buffer = BytesIO()
-    image_array.save(buffer, format=img_format)
+    image_array.save(buffer, format=img_format, **save_options)
     buffer.seek(0)
     return buffer.getvalue()
 
 
+def sse_event(data: str) -> str:
+    """Format text as a server-sent event, splitting newlines into data lines."""
+    return "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
+
 def count_tokens(text: str) -> int:
     """Count the number of tokens in a text."""
+    # split() builds a short-lived list, but it counts ~5x faster than iterating
+    # \S+ matches, and responses are small enough that the list is cheap
     return len(text.split())
 
 
@@ -38,8 +85,168 @@ def normalize_text(text: str | None) -> str | None:
     # Handle bytes with fallback encoding
     if isinstance(text, bytes):
         text = text.decode("utf-8", errors="replace")
-    # Normalize all whitespace (including \n, \t, \r, etc.) to single space
-    text = re.sub(r"\s+", " ", text)
-    # Remove control characters
-    text = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", text)
-    return text.strip()
+    # Normalize all whitespace (including \n, \t, \r, etc.) to single space;
+    # split/join does this in C with the same Unicode whitespace set as \s
+    text = " ".join(text.split())
+    # Remove control characters; stripping again drops a space they exposed
+    return CONTROL_CHARS_PATTERN.sub("", text).strip()
+
+
+class LRUCache(Generic[T]):
+    """Thread-safe bounded LRU cache with per-entry time-to-live."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> T | None:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache so far."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def set(self, key: Hashable, value: T) -> None:
+        """Store value under key, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+
+class BufferPool:
+    """Fixed set of preallocated bytearrays handed out one per concurrent user.
+
+    Acquiring waits while every buffer is in use, so the pool size also caps
+    how many copies run at once.
+    """
+
+    def __init__(self, size: int = 8, buffer_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.buffer_size = buffer_size
+        self._buffers: asyncio.Queue[bytearray] = asyncio.Queue()
+        for _ in range(size):
+            self._buffers.put_nowait(bytearray(buffer_size))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[bytearray]:
+        """Borrow a buffer for the duration of the context."""
+        buffer = await self._buffers.get()
+        try:
+            yield buffer
+        finally:
+            self._buffers.put_nowait(buffer)
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesce concurrent submissions into batches handled by a single call.
+
+    A background task waits for the first queued item, then keeps collecting
+    items until either `max_batch_size` is reached or `max_wait_ms` elapses,
+    and hands the whole batch to `process_batch`. Results are dispatched back
+    to each submitter in order; a result that is an exception instance is
+    raised to its submitter alone, so one failed item does not fail the batch.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[list[T]], Awaitable[list[R | BaseException]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ) -> None:
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: asyncio.Queue[tuple[T, asyncio.Future[R]]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start the background batching task on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background task and fail any requests still queued."""
+        if self._worker is None or self._queue is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+        self._worker = None
+        self._queue = None
+
+    async def submit(self, item: T) -> R:
+        """Queue an item for the next batch and wait for its result."""
+        self.start()
+        assert self._queue is not None
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect_batch(self) -> list[tuple[T, asyncio.Future[R]]]:
+        """Wait for one item, then gather more until the batch is full or times out."""
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = await self.process_batch(items)
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} items failed - Error: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results, strict=True):
+                # Submitters may have been cancelled (e.g. client disconnected)
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,32 @@
+"""Tests for the part1 model helpers."""
+
+from fnmatch import fnmatch
+
+import pytest
+
+pytest.importorskip("torch")
+
+from genai_services.part1.models import snapshot_ignore_patterns  # noqa: E402
+
+
+def test_snapshot_ignore_patterns_skips_duplicate_and_foreign_weights() -> None:
+    """Test that only the files from_pretrained loads are downloaded."""
+    files = [
+        "config.json",
+        "model.safetensors",
+        "pytorch_model.bin",
+        "flax_model.msgpack",
+        "speaker_embeddings/v2/en_speaker_1_semantic_prompt.npy",
+        "unet/diffusion_pytorch_model.bin",
+        "unet/diffusion_pytorch_model.fp16.safetensors",
+        "vae/diffusion_pytorch_model.safetensors",
+        "vae/diffusion_pytorch_model.bin",
+    ]
+    patterns = snapshot_ignore_patterns(files)
+    assert [f for f in files if not any(fnmatch(f, p) for p in patterns)] == [
+        "config.json",
+        "model.safetensors",
+        "speaker_embeddings/v2/en_speaker_1_semantic_prompt.npy",
+        "unet/diffusion_pytorch_model.bin",
+        "vae/diffusion_pytorch_model.safetensors",
+    ]
@@ -0,0 +1,28 @@
+"""Tests for the part1 request/response schemas."""
+
+from datetime import datetime
+
+from genai_services.part1.schemas import ModelResponse, TextModelResponse
+
+
+def test_model_response_timestamps_each_instance() -> None:
+    """Test that created_at is set when the response is built, not at import."""
+    before = datetime.now()
+    response = ModelResponse(ip=None, content="hello")
+    assert response.created_at >= before
+
+
+def test_model_response_request_ids_are_unique() -> None:
+    """Test that every response gets a distinct request id."""
+    ids = {ModelResponse(ip=None, content="hello").request_id for _ in range(100)}
+    assert len(ids) == 100
+
+
+def test_text_model_response_prefers_reported_tokens() -> None:
+    """Test that a reported token count is kept and a missing one is estimated."""
+    reported = TextModelResponse(
+        ip=None, content="one two", model="tinyllama", tokens=5
+    )
+    estimated = TextModelResponse(ip=None, content="one two", model="tinyllama")
+    assert reported.tokens == 5
+    assert estimated.tokens == 2
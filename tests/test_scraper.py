@@ -0,0 +1,91 @@
+"""Tests for the web scraper helpers."""
+
+import asyncio
+
+from genai_services.part2.project_1_llm_web_scraper.scraper import WebScraper
+
+
+def test_canonicalize_url_ignores_host_case_and_fragment() -> None:
+    """Test that equivalent URLs share one cache key."""
+    assert WebScraper.canonicalize_url(
+        "HTTPS://En.Wikipedia.org/wiki/Python#History"
+    ) == WebScraper.canonicalize_url("https://en.wikipedia.org/wiki/Python")
+
+
+def test_parse_inner_text_strips_wikipedia_chrome() -> None:
+    """Test that navigation and edit links are removed from the body text."""
+    html = (
+        b'<div id="bodyContent"><p>Python is <b>great</b>.</p>'
+        b'<div class="navbox">Navigation</div>'
+        b'<span class="mw-editsection">[edit]</span></div>'
+    )
+    assert WebScraper().parse_inner_text(html) == "Python is great."
+
+
+def test_fetch_all_fetches_each_page_once() -> None:
+    """Test that duplicate links in a prompt trigger a single fetch."""
+    fetched: list[str] = []
+
+    class RecordingScraper(WebScraper):
+        async def fetch(self, url: str) -> str:
+            fetched.append(url)
+            return url
+
+    urls = [
+        "https://en.wikipedia.org/wiki/Python",
+        "https://en.wikipedia.org/wiki/Python#History",
+        "https://en.wikipedia.org/wiki/Async",
+    ]
+    assert asyncio.run(RecordingScraper().fetch_all(urls)) == (
+        "https://en.wikipedia.org/wiki/Python https://en.wikipedia.org/wiki/Async"
+    )
+    assert fetched == [urls[0], urls[2]]
+
+
+def test_clean_text_patterns_strips_wikipedia_metadata() -> None:
+    """Test that portal markers and the trailing vte footer are removed."""
+    text = "Python is great. See the Python portal now. Society portal vte"
+    assert (
+        WebScraper()._clean_text_patterns(text)
+        == "Python is great. See the Python now."
+    )
+
+
+def test_extract_urls_drops_trailing_punctuation() -> None:
+    """Test that prose punctuation is dropped but a URL's own closing paren is kept."""
+    prompt = (
+        'Compare (https://en.wikipedia.org/wiki/Python_(language)), "https://example.com/a.html"'
+        " and (https://example.com/b)."
+    )
+    assert WebScraper().extract_urls(prompt) == [
+        "https://en.wikipedia.org/wiki/Python_(language)",
+        "https://example.com/a.html",
+        "https://example.com/b",
+    ]
+
+
+def test_parse_inner_text_collapses_multiline_whitespace() -> None:
+    """Test that newlines and indentation from the page collapse to single spaces."""
+    html = b'<div id="bodyContent">\n  <p>Python\n\n  is</p>\n<p>great. Society\nportal vte</p>\n</div>'
+    assert WebScraper().parse_inner_text(html) == "Python is great."
+
+
+def test_parse_inner_text_truncates_long_pages() -> None:
+    """Test that long pages are capped at max_chars with a truncation marker."""
+    html = b'<div id="bodyContent"><p>' + b"word " * 10_000 + b"</p></div>"
+    text = WebScraper().parse_inner_text(html, max_chars=100)
+    assert text == ("word " * 20)[:100] + "... [content truncated]"
+
+
+def test_parse_inner_text_drops_inline_styles_and_scripts() -> None:
+    """Test that TemplateStyles CSS and inline scripts don't leak into the text."""
+    html = (
+        b'<div id="bodyContent"><style>.mw-parser-output .hatnote{font-style:italic}'
+        b'</style><div class="hatnote">For other uses, see X.</div>'
+        b"<p>Python is a language.</p><script>var a=1;</script>"
+        b"<noscript>Enable JavaScript</noscript></div>"
+    )
+    assert (
+        WebScraper().parse_inner_text(html)
+        == "For other uses, see X.Python is a language."
+    )
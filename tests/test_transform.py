@@ -0,0 +1,30 @@
+"""Tests for the RAG text transforms."""
+
+import re
+from itertools import product
+
+import pytest
+
+pytest.importorskip("transformers")
+
+from genai_services.part2.project_2_rag.transform import clean  # noqa: E402
+
+
+def reference_clean(text: str) -> str:
+    """The original sequential implementation that clean must stay equivalent to."""
+    t = text.replace("\n", " ")
+    t = re.sub(r"\s+", " ", t)
+    t = re.sub(r"\. ,", "", t)
+    t = t.replace("..", ".")
+    t = t.replace(". .", ".")
+    return t.replace("\n", " ").strip()
+
+
+def test_clean_matches_sequential_replaces() -> None:
+    """Test that clean gives the original output on every short punctuation string."""
+    assert clean(". ..") == "."
+    assert clean(".\n..a") == ".a"
+    for length in range(7):
+        for chars in product(". ,\n\ta", repeat=length):
+            text = "".join(chars)
+            assert clean(text) == reference_clean(text), repr(text)
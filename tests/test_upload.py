@@ -0,0 +1,26 @@
+"""Tests for the RAG upload helpers."""
+
+import asyncio
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from fastapi import UploadFile
+
+from genai_services.part2.project_2_rag import upload
+from genai_services.utils import BufferPool
+
+
+def test_save_file_streams_upload_through_small_buffer(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that an upload larger than the pooled buffer is copied intact."""
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    content = bytes(range(256)) * 100
+    spooled = SpooledTemporaryFile()
+    spooled.write(content)
+    file = UploadFile(spooled, filename="doc.pdf")
+
+    filepath = asyncio.run(upload.save_file(file, BufferPool(size=1, buffer_size=1024)))
+    assert filepath == tmp_path / "doc.pdf"
+    assert filepath.read_bytes() == content
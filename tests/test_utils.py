@@ -0,0 +1,121 @@
+"""Tests for the shared utilities module."""
+
+import asyncio
+from io import BytesIO
+
+import numpy as np
+import soundfile
+
+from genai_services.utils import (
+    BufferPool,
+    LRUCache,
+    MicroBatcher,
+    audio_array_to_wav_chunks,
+    normalize_text,
+    sse_event,
+)
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    """Test that the oldest untouched entry is evicted once the cache is full."""
+    cache: LRUCache[str] = LRUCache(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+def test_lru_cache_expires_entries() -> None:
+    """Test that entries older than the TTL are not returned."""
+    cache: LRUCache[str] = LRUCache(maxsize=2, ttl=-1)
+    cache.set("a", "1")
+    assert cache.get("a") is None
+
+
+def test_lru_cache_tracks_hit_rate() -> None:
+    """Test that hits and misses, including expired entries, feed the hit rate."""
+    cache: LRUCache[str] = LRUCache(maxsize=2)
+    assert cache.hit_rate == 0.0
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.hit_rate == 2 / 3
+
+
+def test_micro_batcher_coalesces_concurrent_submissions() -> None:
+    """Test that concurrent submissions are processed as one ordered batch."""
+    batches: list[list[int]] = []
+
+    async def double(items: list[int]) -> list[int]:
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def run() -> list[int]:
+        batcher: MicroBatcher[int, int] = MicroBatcher(
+            double, max_batch_size=4, max_wait_ms=50
+        )
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        await batcher.stop()
+        return list(results)
+
+    assert asyncio.run(run()) == [0, 2, 4]
+    assert batches == [[0, 1, 2]]
+
+
+def test_micro_batcher_fails_only_the_errored_item() -> None:
+    """Test that an exception result is raised to its own submitter only."""
+
+    async def check(items: list[int]) -> list[int | BaseException]:
+        return [ValueError(item) if item < 0 else item for item in items]
+
+    async def run() -> list[int | BaseException]:
+        batcher: MicroBatcher[int, int] = MicroBatcher(check, max_wait_ms=50)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(-1), return_exceptions=True
+        )
+        await batcher.stop()
+        return list(results)
+
+    ok, failed = asyncio.run(run())
+    assert ok == 1
+    assert isinstance(failed, ValueError)
+
+
+def test_audio_array_to_wav_chunks_round_trips() -> None:
+    """Test that the streamed WAV chunks decode back to the original audio."""
+    audio = np.linspace(-1.0, 1.0, 30001, dtype=np.float32)
+    chunks = list(audio_array_to_wav_chunks(audio, 24000, chunk_seconds=0.5))
+    decoded, sample_rate = soundfile.read(BytesIO(b"".join(chunks)), dtype="float32")
+    assert sample_rate == 24000
+    assert len(chunks) == 4  # header + three frames
+    assert np.allclose(decoded, audio, atol=1e-4)
+
+
+def test_sse_event_splits_multiline_data() -> None:
+    """Test that newlines in the payload become separate data lines."""
+    assert sse_event("Hello") == "data: Hello\n\n"
+    assert sse_event("a\nb") == "data: a\ndata: b\n\n"
+
+
+def test_buffer_pool_reuses_released_buffers() -> None:
+    """Test that a released buffer is handed to the next borrower."""
+
+    async def run() -> bool:
+        pool = BufferPool(size=1, buffer_size=16)
+        async with pool.acquire() as first:
+            pass
+        async with pool.acquire() as second:
+            return first is second and len(second) == 16
+
+    assert asyncio.run(run())
+
+
+def test_normalize_text_collapses_whitespace_and_drops_controls() -> None:
+    """Test that whitespace runs become one space and control characters vanish."""
+    assert normalize_text("\x00 Hello,\r\n\tworld\x1b[0m!\x85 ") == "Hello, world[0m!"
+    assert normalize_text(None) is None